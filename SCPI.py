@@ -6,45 +6,190 @@ import serial
 import socket
 import threading
 import queue
+import time
+import functools
 
 import serial.tools.list_ports
 
+
+@functools.lru_cache(maxsize=128)
+def _encode_command(command):
+    """Returns the newline-terminated ASCII bytes for a command string.
+
+    Cached so repeated commands (polling queries, scripted bursts) skip
+    the per-send concatenation and encode.
+    """
+    if not command.endswith('\n'):
+        command += '\n'
+    return command.encode('ascii')
+
+
 class SCPI_Controller:
     """
     Handles communication with the instrument via Serial or TCP/IP.
     """
-    def __init__(self):
+
+    # Upper bound on how many queued commands are coalesced into one write.
+    MAX_WRITE_BATCH = 32
+
+    # Socket-level timeout: reads poll at this granularity and check the
+    # caller's deadline, instead of blocking a full I/O timeout per recv.
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, rx_chunk=256):
         self.instrument = None
         self.connection_type = None
-
-    def get_available_ports(self):
-        """Returns a list of available serial ports."""
-        return [port.device for port in serial.tools.list_ports.comports()]
+        # Bound per connection so the hot paths dispatch directly instead
+        # of string-comparing connection_type on every command.
+        self._send = None
+        self._readline = None
+        self._tx_queue = queue.Queue()
+        self._writer_thread = None
+        self._rx_buf = bytearray()
+        # Small chunks keep short interactive responses from stacking up
+        # behind one large recv; power of two, 256-16384 is sensible.
+        self._chunk_size = rx_chunk
+        # Reusable receive scratch: recv_into here avoids allocating a
+        # fresh bytes object per recv on polling workloads.
+        self._rx_scratch = bytearray(65536)
+        self._rx_mv = memoryview(self._rx_scratch)
+        self._io_timeout = 2.0
+        self._ports_cache = (0.0, [])
+        # Optional callback invoked with an error message when a queued
+        # (fire-and-forget) write fails in the background writer thread.
+        self.on_write_error = None
+
+    def get_available_ports(self, max_age=2.0):
+        """Returns a list of available serial ports.
+
+        Enumeration can take hundreds of milliseconds on some platforms,
+        so results are cached and reused for up to max_age seconds.
+        """
+        ts, ports = self._ports_cache
+        if time.monotonic() - ts < max_age:
+            return ports
+        ports = [port.device for port in serial.tools.list_ports.comports()]
+        self._ports_cache = (time.monotonic(), ports)
+        return ports
 
     def connect_serial(self, port, baudrate, timeout=1):
         """Establishes a serial connection."""
         try:
             self.instrument = serial.Serial(port, int(baudrate), timeout=timeout)
             self.connection_type = 'serial'
+            self._send = self.instrument.write
+            self._readline = self._serial_readline
             return f"Successfully connected to {port} at {baudrate} baud."
         except Exception as e:
             self.instrument = None
             return f"Error connecting to {port}: {e}"
 
-    def connect_tcp(self, host, port, timeout=2):
-        """Establishes a TCP/IP socket connection."""
+    def connect_tcp(self, host, port, timeout=2, socket_options=None):
+        """Establishes a TCP/IP socket connection.
+
+        TCP_NODELAY is set by default so small SCPI commands are flushed
+        immediately instead of waiting for Nagle's coalescing window.
+        Extra options (e.g. SO_KEEPALIVE) can be passed via socket_options
+        as (level, optname, value) tuples.
+        """
+        if socket_options is None:
+            socket_options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
         try:
             self.instrument = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            for level, optname, value in socket_options:
+                self.instrument.setsockopt(level, optname, value)
+            try:
+                # Linux only: disable delayed ACKs for request/response traffic
+                self.instrument.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+            except (AttributeError, OSError):
+                pass
+            self._enable_keepalive(self.instrument)
             self.instrument.settimeout(timeout)
             self.instrument.connect((host, int(port)))
+            # timeout stays the socket default so sends keep the full
+            # deadline (a short send timeout could abort sendall with an
+            # unknown number of bytes already written); only the recv
+            # poll in _recv_chunk drops to POLL_INTERVAL.
+            self._io_timeout = timeout
             self.connection_type = 'tcp'
+            self._send = self.instrument.sendall
+            self._readline = self._tcp_readline
+            self._rx_buf.clear()
             return f"Successfully connected to {host}:{port}."
         except Exception as e:
             self.instrument = None
             return f"Error connecting to {host}:{port}: {e}"
 
+    def queue_command(self, command):
+        """Queues a fire-and-forget command for the background writer.
+
+        Commands queued in quick succession are drained together and sent
+        as a single write, turning N small packets into one. Queries must
+        still go through query() so responses stay correlated.
+        """
+        if not self.instrument:
+            raise ConnectionError("Not connected to any instrument.")
+        self._start_writer()
+        self._tx_queue.put(command)
+
+    def _start_writer(self):
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer_thread.start()
+
+    def _writer_loop(self):
+        """Drains the TX queue, coalescing pending commands into one send."""
+        while True:
+            command = self._tx_queue.get()
+            if command is None:  # sentinel posted by disconnect()
+                break
+            batch = [command]
+            stop = False
+            while len(batch) < self.MAX_WRITE_BATCH:
+                try:
+                    nxt = self._tx_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            try:
+                self.send_command('\n'.join(cmd.rstrip('\n') for cmd in batch))
+            except Exception as e:
+                if self.on_write_error:
+                    self.on_write_error(str(e))
+            if stop:
+                break
+
+    @staticmethod
+    def _enable_keepalive(sock, idle=10, interval=3, count=3):
+        """Turns on TCP keepalive with short probe timings.
+
+        Without this a power-cycled or unplugged instrument leaves recv
+        hanging for the OS default (~2 hours on Linux); with ~10 s idle
+        and 3 probes a dead peer is detected in under half a minute.
+        The tuning knobs differ per OS, so each is guarded.
+        """
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, 'TCP_KEEPIDLE'):  # Linux
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count)
+            elif hasattr(socket, 'TCP_KEEPALIVE'):  # macOS
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, idle)
+            elif hasattr(socket, 'SIO_KEEPALIVE_VALS'):  # Windows
+                sock.ioctl(socket.SIO_KEEPALIVE_VALS, (1, idle * 1000, interval * 1000))
+        except OSError:
+            pass
+
     def disconnect(self):
         """Closes the connection."""
+        if self._writer_thread and self._writer_thread.is_alive():
+            self._tx_queue.put(None)
+            self._writer_thread.join(timeout=1)
+        self._writer_thread = None
         if self.instrument:
             try:
                 self.instrument.close()
@@ -53,47 +198,180 @@ class SCPI_Controller:
                 message = f"Error during disconnection: {e}"
             self.instrument = None
             self.connection_type = None
+            self._send = None
+            self._readline = None
             return message
         return "Already disconnected."
 
     def send_command(self, command):
-        """Sends a command to the instrument."""
+        """Sends a command (str or pre-encoded bytes) to the instrument."""
         if not self.instrument:
             raise ConnectionError("Not connected to any instrument.")
-        
-        # Ensure command is bytes and ends with a newline
-        if not command.endswith('\n'):
-            command += '\n'
-        
+
+        # Callers passing bytes are trusted to have framed the command;
+        # strings go through the cached newline-terminate-and-encode path.
+        data = command if isinstance(command, bytes) else _encode_command(command)
+
         try:
-            if self.connection_type == 'serial':
-                self.instrument.write(command.encode('ascii'))
-            elif self.connection_type == 'tcp':
-                self.instrument.sendall(command.encode('ascii'))
+            self._send(data)
         except Exception as e:
             raise IOError(f"Failed to send command: {e}")
 
-    def read_response(self, buffer_size=4096):
-        """Reads a response from the instrument."""
+    def read_response(self, buffer_size=None, timeout=None):
+        """Reads one newline-terminated response from the instrument.
+
+        TCP is a byte stream, so a single recv() may return a partial
+        response or several responses at once. Received bytes are kept in
+        a per-connection buffer, complete lines are sliced off at the
+        terminator and any trailing partial line is retained for the next
+        call. timeout is the end-to-end deadline for a complete line and
+        defaults to the connection's I/O timeout.
+        """
         if not self.instrument:
             raise ConnectionError("Not connected to any instrument.")
-        
+
+        chunk_size = buffer_size or self._chunk_size
+        if timeout is None:
+            timeout = self._io_timeout
         try:
-            if self.connection_type == 'serial':
-                response = self.instrument.readline().decode('ascii').strip()
-            elif self.connection_type == 'tcp':
-                response = self.instrument.recv(buffer_size).decode('ascii').strip()
-            return response
+            return self._readline(chunk_size, timeout)
         except socket.timeout:
             return "Timeout: No response from instrument."
         except Exception as e:
             raise IOError(f"Failed to read response: {e}")
 
+    def _serial_readline(self, chunk_size, timeout):
+        # Stay in bytes until the very end: rstrip on bytes runs in C
+        # and avoids the extra str allocations of decode().strip().
+        return self.instrument.readline().rstrip(b'\r\n').decode('ascii')
+
+    def _tcp_readline(self, chunk_size, timeout):
+        # find() is memchr-backed C code; tracking how far we have
+        # already scanned keeps long frames from being rescanned
+        # from the start after every recv.
+        deadline = time.monotonic() + timeout
+        scan_from = 0
+        while True:
+            newline = self._rx_buf.find(b'\n', scan_from)
+            if newline != -1:
+                line = bytes(self._rx_buf[:newline])
+                del self._rx_buf[:newline + 1]
+                return line.rstrip(b'\r').decode('ascii')
+            scan_from = len(self._rx_buf)
+            try:
+                self._recv_chunk(chunk_size)
+            except socket.timeout:
+                if time.monotonic() >= deadline:
+                    raise
+
+    def _read_exact(self, count, deadline=None):
+        """Returns exactly count raw bytes from the connection."""
+        if self.connection_type == 'serial':
+            data = self.instrument.read(count)
+            if len(data) < count:
+                raise IOError(f"Short read: expected {count} bytes, got {len(data)}.")
+            return bytes(data)
+        while len(self._rx_buf) < count:
+            try:
+                self._recv_chunk(len(self._rx_scratch))
+            except socket.timeout:
+                if deadline is None or time.monotonic() >= deadline:
+                    raise
+        data = bytes(self._rx_buf[:count])
+        del self._rx_buf[:count]
+        return data
+
+    def _recv_chunk(self, size):
+        """Receives up to size bytes into the reusable scratch buffer and
+        appends them to the RX buffer, avoiding a bytes allocation per recv.
+
+        The socket timeout is dropped to POLL_INTERVAL only for the recv
+        itself so the framed readers can poll their deadlines; sends keep
+        the connection's full timeout.
+        """
+        sock = self.instrument
+        timeout = sock.gettimeout()
+        sock.settimeout(self.POLL_INTERVAL)
+        try:
+            n = sock.recv_into(self._rx_mv[:min(size, len(self._rx_scratch))])
+        finally:
+            sock.settimeout(timeout)
+        if not n:
+            raise ConnectionError("Connection closed by instrument.")
+        self._rx_buf += self._rx_mv[:n]
+        return n
+
+    def read_block(self, dtype='int16', byteorder='<'):
+        """Reads an IEEE 488.2 definite-length binary block response.
+
+        Parses the '#<n><len>' header, reads exactly <len> payload bytes
+        and returns them as a numpy array, so large waveform downloads
+        (CURV?, WAV:DATA?) are one bulk copy instead of per-sample
+        Python parsing.
+        """
+        import numpy  # only needed for binary block transfers
+
+        if not self.instrument:
+            raise ConnectionError("Not connected to any instrument.")
+        try:
+            deadline = time.monotonic() + self._io_timeout
+            header = self._read_exact(2, deadline)
+            if header[:1] != b'#':
+                raise IOError(f"Not a binary block header: {header!r}")
+            length = int(self._read_exact(int(header[1:2]), deadline))
+            payload = self._read_exact(length, deadline)
+            # Consume the trailing terminator if it is already buffered.
+            if self.connection_type == 'tcp' and self._rx_buf[:1] == b'\n':
+                del self._rx_buf[:1]
+            elif self.connection_type == 'serial' and self.instrument.in_waiting:
+                self.instrument.read(1)
+            return numpy.frombuffer(payload, dtype=numpy.dtype(dtype).newbyteorder(byteorder))
+        except socket.timeout:
+            raise IOError("Timeout while reading binary block.")
+        except (IOError, ConnectionError):
+            raise
+        except Exception as e:
+            raise IOError(f"Failed to read binary block: {e}")
+
     def query(self, command):
         """Sends a command and reads the response."""
         self.send_command(command)
         return self.read_response()
 
+    # Bytes allowed in flight on a serial link before draining replies,
+    # sized to stay inside a typical instrument RX FIFO.
+    MAX_SERIAL_PIPELINE = 256
+
+    def query_many(self, commands):
+        """Pipelines a batch of queries and returns their responses in order.
+
+        SCPI responses arrive in query order, so sending the whole batch
+        before reading pays one link round-trip instead of one per
+        command. On serial links the batch is flushed in slices of at
+        most MAX_SERIAL_PIPELINE bytes, draining responses between
+        slices so the device FIFO is never overrun.
+        """
+        if not self.instrument:
+            raise ConnectionError("Not connected to any instrument.")
+        responses = []
+        if self.connection_type == 'serial':
+            group, size = [], 0
+            for command in commands:
+                data = _encode_command(command)
+                if group and size + len(data) > self.MAX_SERIAL_PIPELINE:
+                    self.send_command(b''.join(group))
+                    responses.extend(self.read_response() for _ in group)
+                    group, size = [], 0
+                group.append(data)
+                size += len(data)
+            if group:
+                self.send_command(b''.join(group))
+                responses.extend(self.read_response() for _ in group)
+        else:
+            self.send_command(b''.join(_encode_command(c) for c in commands))
+            responses.extend(self.read_response() for _ in commands)
+        return responses
+
 
 class App(tk.Tk):
     """
@@ -106,7 +384,20 @@ class App(tk.Tk):
         self.geometry("600x550") # Increased height for new fields
 
         self.response_queue = queue.Queue()
-        self.after(100, self.process_queue)
+        self.controller.on_write_error = lambda msg: self._post_response(f"ERROR: {msg}")
+        # Worker threads wake the mainloop via a virtual event; the timer
+        # below is only a low-rate backstop in case an event is ever lost.
+        self.bind('<<SCPIResponse>>', self._drain_queue)
+        self._pending_ports = []
+        self.bind('<<SCPIPorts>>', self._apply_ports)
+        self.after(500, self.process_queue)
+
+        # Single long-lived I/O worker; spawning a thread per send/query
+        # piles up short-lived threads under scripted bursts and lets
+        # queries interleave on the wire.
+        self._job_queue = queue.Queue()
+        self._job_thread = threading.Thread(target=self._job_loop, daemon=True)
+        self._job_thread.start()
 
         self.create_widgets()
         self.update_serial_ports()
@@ -124,10 +415,10 @@ class App(tk.Tk):
         # Connection Type
         self.conn_type_var = tk.StringVar(value="Serial")
         ttk.Label(conn_frame, text="Type:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
-        serial_rb = ttk.Radiobutton(conn_frame, text="Serial", variable=self.conn_type_var, value="Serial", command=self.toggle_connection_fields)
-        serial_rb.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
-        tcp_rb = ttk.Radiobutton(conn_frame, text="TCP/IP", variable=self.conn_type_var, value="TCP/IP", command=self.toggle_connection_fields)
-        tcp_rb.grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
+        self.serial_rb = ttk.Radiobutton(conn_frame, text="Serial", variable=self.conn_type_var, value="Serial", command=self.toggle_connection_fields)
+        self.serial_rb.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+        self.tcp_rb = ttk.Radiobutton(conn_frame, text="TCP/IP", variable=self.conn_type_var, value="TCP/IP", command=self.toggle_connection_fields)
+        self.tcp_rb.grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
 
         # Serial Port
         self.port_label = ttk.Label(conn_frame, text="Port:")
@@ -190,7 +481,17 @@ class App(tk.Tk):
         
         self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=10)
         self.log_text.pack(fill=tk.BOTH, expand=True)
-        self.log_text.configure(state='disabled')
+        # Readonly by swallowing keystrokes: toggling state='disabled'
+        # around every insert costs two style recomputes per log line.
+        self.log_text.bind('<Key>', lambda event: 'break')
+
+        # Widgets toggled on connect/disconnect; built once so
+        # set_ui_state does not have to walk the widget tree.
+        self._toggled_widgets = [
+            self.serial_rb, self.tcp_rb, self.port_combo, self.refresh_button,
+            self.baud_entry, self.addr_enable_check, self.addr_entry,
+            self.ip_entry, self.tcp_port_entry,
+        ]
 
         self.toggle_connection_fields()
         self.toggle_address_field()
@@ -235,17 +536,25 @@ class App(tk.Tk):
         self.toggle_address_field()
 
     def update_serial_ports(self):
-        """Refresh the list of available serial ports."""
-        ports = self.controller.get_available_ports()
+        """Refresh the list of available serial ports without blocking the GUI."""
+        self.run_in_thread(self._refresh_ports_worker)
+
+    def _refresh_ports_worker(self):
+        self._pending_ports = self.controller.get_available_ports()
+        try:
+            self.event_generate('<<SCPIPorts>>', when='tail')
+        except tk.TclError:
+            pass
+
+    def _apply_ports(self, event=None):
+        ports = self._pending_ports
         self.port_combo['values'] = ports
         if ports:
             self.port_var.set(ports[0])
 
     def log(self, message):
         """Append a message to the log text area."""
-        self.log_text.configure(state='normal')
         self.log_text.insert(tk.END, message + '\n')
-        self.log_text.configure(state='disabled')
         self.log_text.see(tk.END)
 
     def connect(self):
@@ -286,14 +595,20 @@ class App(tk.Tk):
 
         conn_state = tk.DISABLED if connected else tk.NORMAL
         self.connect_button.config(state=conn_state)
-        for child in self.connect_button.master.winfo_children():
-            if isinstance(child, (ttk.Entry, ttk.Combobox, ttk.Radiobutton, ttk.Button, ttk.Checkbutton)) and child not in [self.connect_button, self.disconnect_button]:
-                 child.config(state=conn_state)
+        for widget in self._toggled_widgets:
+            widget.configure(state=conn_state)
 
     def run_in_thread(self, target, *args):
-        """Run a function in a separate thread to avoid blocking the GUI."""
-        thread = threading.Thread(target=target, args=args, daemon=True)
-        thread.start()
+        """Dispatch a function to the I/O worker thread off the GUI."""
+        self._job_queue.put((target, args))
+
+    def _job_loop(self):
+        while True:
+            target, args = self._job_queue.get()
+            try:
+                target(*args)
+            except Exception as e:
+                self._post_response(f"ERROR: {e}")
 
     def get_full_command(self):
         """Constructs the full command, prepending address if enabled."""
@@ -311,11 +626,19 @@ class App(tk.Tk):
         self.log(f"SEND: {command}")
         self.run_in_thread(self._send_worker, command)
 
+    def _post_response(self, message):
+        """Queue a message for the GUI and wake the mainloop immediately."""
+        self.response_queue.put(message)
+        try:
+            self.event_generate('<<SCPIResponse>>', when='tail')
+        except tk.TclError:
+            pass  # window is being torn down
+
     def _send_worker(self, command):
         try:
-            self.controller.send_command(command)
+            self.controller.queue_command(command)
         except Exception as e:
-            self.response_queue.put(f"ERROR: {e}")
+            self._post_response(f"ERROR: {e}")
 
     def query_command(self):
         command = self.get_full_command()
@@ -327,19 +650,26 @@ class App(tk.Tk):
     def _query_worker(self, command):
         try:
             response = self.controller.query(command)
-            self.response_queue.put(f"RECV: {response}")
+            self._post_response(f"RECV: {response}")
         except Exception as e:
-            self.response_queue.put(f"ERROR: {e}")
+            self._post_response(f"ERROR: {e}")
 
-    def process_queue(self):
-        """Process messages from the worker threads."""
+    def _drain_queue(self, event=None):
+        """Log all pending worker messages in one insert and one scroll."""
+        pending = []
         try:
             while True:
-                message = self.response_queue.get_nowait()
-                self.log(message)
+                pending.append(self.response_queue.get_nowait())
         except queue.Empty:
             pass
-        self.after(100, self.process_queue)
+        if pending:
+            self.log_text.insert(tk.END, '\n'.join(pending) + '\n')
+            self.log_text.see(tk.END)
+
+    def process_queue(self):
+        """Backstop drain in case a virtual event is ever lost."""
+        self._drain_queue()
+        self.after(500, self.process_queue)
 
     def on_closing(self):
         """Handle window closing event."""
@@ -4,10 +4,18 @@ from typing import Optional, Union, List
 from serial import SerialException
 from enum import Enum
 
+import numpy as np
+
 # 设备常量定义（源自用户手册）
 MAX_CURRENT_6485 = 0.021  # 6485最大电流21mA
 MAX_VOLTAGE_6485 = 220    # 6485最大输入电压220V峰值
 MEASURE_RANGES = [2e-9, 2e-8, 2e-7, 2e-6, 2e-5, 2e-4, 2e-3, 2.1e-2]  # 8个电流量程（2nA~21mA）
+MEASURE_RANGE_SET = frozenset(MEASURE_RANGES)  # O(1)量程合法性判断
+
+# 预编码的常用命令字节串，热路径上免去每次strip+encode
+CMD_IDN = b"*IDN?\n"
+CMD_READ = b"READ?\n"
+CMD_TRAC_DATA = b"TRAC:DATA?\n"
 
 class InstrumentModel(Enum):
     """仪器型号枚举"""
@@ -43,6 +51,7 @@ class KeithleyPicoammeter:
         self._is_connected = False
         self._current_range: Optional[float] = None  # 当前量程
         self._filter_enabled = False  # 滤波器启用状态
+        self._dirty = False  # 上次交换超时，下次发送前需清理输入缓冲
 
     def connect(self) -> bool:
         """建立串口连接"""
@@ -57,11 +66,15 @@ class KeithleyPicoammeter:
                 xonxoff=False,
                 rtscts=False
             )
-            time.sleep(0.5)  # 等待设备初始化
+            self._enable_low_latency()
+            time.sleep(0.5)  # 等待设备初始化（USB枚举稳定时间，属硬件特性）
+            # 打开后清空一次缓冲区即可，不再每条命令都flush
+            self.serial.reset_input_buffer()
+            self.serial.reset_output_buffer()
             self._is_connected = True
-            # 复位设备到默认状态
+            # 复位设备到默认状态，*OPC?在复位完成时即应答，无需估计等待
             self.send_command("*RST")
-            time.sleep(0.2)
+            self.wait_opc()
             # 确认设备标识
             idn = self.get_identity()
             if self.model.value in idn:
@@ -75,6 +88,25 @@ class KeithleyPicoammeter:
             print(f"连接失败：{str(e)}")
             return False
 
+    def _enable_low_latency(self) -> None:
+        """尽力开启串口驱动的低延迟模式
+
+        FTDI等USB转串口芯片默认有16ms的接收缓冲合并延迟，每条SCPI响应
+        都要在驱动里多等一拍；Linux下通过TIOCSSERIAL置ASYNC_LOW_LATENCY
+        标志可降到1-2ms。非Linux平台或不支持的驱动直接跳过。
+        """
+        try:
+            import array
+            import fcntl
+            import termios
+            ASYNC_LOW_LATENCY = 0x2000
+            buf = array.array('i', [0] * 64)
+            fcntl.ioctl(self.serial.fileno(), termios.TIOCGSERIAL, buf)
+            buf[4] |= ASYNC_LOW_LATENCY  # serial_struct.flags
+            fcntl.ioctl(self.serial.fileno(), termios.TIOCSSERIAL, buf)
+        except Exception:
+            pass
+
     def disconnect(self) -> None:
         """断开串口连接"""
         if self.serial and self.serial.is_open:
@@ -94,23 +126,17 @@ class KeithleyPicoammeter:
             return None
         
         try:
-            # 清空缓冲区
-            self.serial.flushInput()
-            self.serial.flushOutput()
+            self._recover_if_dirty()
             # 发送命令（末尾添加换行符）
             cmd = cmd.strip() + "\n"
             self.serial.write(cmd.encode("ascii"))
-            time.sleep(0.1)  # 等待命令执行
-            
+
             if get_response:
-                response = b""
-                while True:
-                    data = self.serial.read(1)
-                    if not data:
-                        break
-                    response += data
-                    if response.endswith(b"\n"):
-                        break
+                # read_until整块读取，终止符到达后立即返回，
+                # 超时上限由串口timeout决定，无需固定sleep
+                response = self.serial.read_until(b"\n")
+                if not response:
+                    self._dirty = True
                 response_str = response.decode("ascii", errors="ignore").strip()
                 # 检查错误响应
                 if response_str.startswith("ERROR"):
@@ -120,17 +146,107 @@ class KeithleyPicoammeter:
             return None
         except SerialException as e:
             print(f"命令发送失败 [{cmd.strip()}]: {str(e)}")
+            # 仅在出错后清理缓冲区，避免残留数据与后续响应错位
+            try:
+                self.serial.reset_input_buffer()
+                self.serial.reset_output_buffer()
+            except Exception:
+                pass
+            return None
+
+    def send_bytes(self, cmd: bytes, get_response: bool = False) -> Optional[str]:
+        """
+        发送预编码的SCPI命令字节串（跳过strip/encode的快速路径）
+        :param cmd: 以\\n结尾的命令字节串
+        :param get_response: 是否需要读取响应
+        """
+        if not self._is_connected or not self.serial:
+            print("未建立连接")
+            return None
+        try:
+            self._recover_if_dirty()
+            self.serial.write(cmd)
+            if get_response:
+                response = self.serial.read_until(b"\n")
+                if not response:
+                    self._dirty = True
+                return response.decode("ascii", errors="ignore").strip()
             return None
+        except SerialException as e:
+            print(f"命令发送失败 [{cmd!r}]: {str(e)}")
+            return None
+
+    def _recover_if_dirty(self) -> None:
+        """上次交换超时后，发送新命令前清掉可能迟到的残留字节"""
+        if self._dirty:
+            self.serial.reset_input_buffer()
+            self._dirty = False
+
+    def send_query_float(self, cmd: bytes) -> Optional[float]:
+        """
+        发送查询并把响应的首个数值字段直接按bytes解析为float
+        （float()自身接受bytes，省去decode出中间字符串再回头解析）
+        """
+        if not self._is_connected or not self.serial:
+            print("未建立连接")
+            return None
+        try:
+            self._recover_if_dirty()
+            self.serial.write(cmd)
+            raw = self.serial.read_until(b"\n")
+            if not raw:
+                self._dirty = True
+                return None
+            field = raw.split(b",", 1)[0].strip()
+            if field.endswith(b"A"):
+                field = field[:-1]
+            return float(field)
+        except (SerialException, ValueError) as e:
+            print(f"查询解析失败 [{cmd!r}]: {str(e)}")
+            return None
+
+    def send_batch(self, cmds: List[str]) -> bool:
+        """
+        将多条设置命令合并为一条;分隔的SCPI复合消息一次发送
+        :param cmds: SCPI命令列表
+        :return: 发送成功返回True
+        """
+        if not self._is_connected or not self.serial:
+            print("未建立连接")
+            return False
+        try:
+            # ;之后SCPI会沿用上一命令的头部路径，非*命令必须以:回到根层级
+            message = ";".join(
+                cmd if cmd.startswith("*") else ":" + cmd.lstrip(":")
+                for cmd in (c.strip() for c in cmds)
+            ) + "\n"
+            self.serial.write(message.encode("ascii"))
+            return True
+        except SerialException as e:
+            print(f"批量命令发送失败: {str(e)}")
+            return False
+
+    def wait_opc(self, timeout: float = 5.0) -> bool:
+        """用*OPC?等待先前命令真正完成（设备完成后才应答1）"""
+        if not self._is_connected or not self.serial:
+            print("未建立连接")
+            return False
+        old_timeout = self.serial.timeout
+        try:
+            self.serial.timeout = timeout
+            response = self.send_command("*OPC?", get_response=True)
+            return response is not None and response.startswith("1")
+        finally:
+            self.serial.timeout = old_timeout
 
     def get_identity(self) -> Optional[str]:
         """获取设备标识（*IDN?）"""
-        return self.send_command("*IDN?", get_response=True)
+        return self.send_bytes(CMD_IDN, get_response=True)
 
     def reset(self) -> bool:
         """复位设备到出厂默认状态"""
-        result = self.send_command("*RST")
-        time.sleep(0.5)
-        return result is not None
+        self.send_command("*RST")
+        return self.wait_opc()
 
     # ------------------------------ 电流测量相关 ------------------------------
     def start_current_measurement(self) -> bool:
@@ -148,7 +264,7 @@ class KeithleyPicoammeter:
         设置电流量程
         :param range_val: 量程值（必须在MEASURE_RANGES中）
         """
-        if range_val not in MEASURE_RANGES:
+        if range_val not in MEASURE_RANGE_SET:
             print(f"无效量程，可选量程：{MEASURE_RANGES}")
             return False
         # 检查电压安全限制
@@ -174,17 +290,7 @@ class KeithleyPicoammeter:
 
     def measure_current(self) -> Optional[float]:
         """测量电流（返回实际测量值）"""
-        response = self.send_command("READ?", get_response=True)
-        if response is None:
-            return None
-        try:
-            current_str = response.strip().split(",")[0].strip()
-            if current_str.endswith("A"):
-                current_str = current_str[:-1]
-            return float(current_str)
-        except (ValueError, IndexError) as e:
-            print(f"电流值解析失败：{response}，异常信息：{e}")
-            return None
+        return self.send_query_float(CMD_READ)
 
     def set_zero_check(self, enable: bool = True) -> bool:
         """启用/禁用零点检查（连接/断开输入时使用）"""
@@ -198,11 +304,11 @@ class KeithleyPicoammeter:
     def set_zero_correct(self, enable: bool = True) -> bool:
         """启用/禁用零点校正（抵消偏移）"""
         if enable:
-            # 先激活零点检查，获取校正值
+            # 先激活零点检查，获取校正值；各步用*OPC?等待真正完成
             self.set_zero_check(True)
-            time.sleep(0.2)
+            self.wait_opc()
             self.send_command("SYST:ZCOR:ACQ")
-            time.sleep(0.1)
+            self.wait_opc()
             cmd = "SYST:ZCOR ON"
         else:
             cmd = "SYST:ZCOR OFF"
@@ -263,40 +369,45 @@ class KeithleyPicoammeter:
         print(f"缓冲区已配置：{sample_count}点")
         return True
 
-    def capture_buffer_data(self, sample_count: int = 1000, range_val: float = 2e-6) -> Optional[List[float]]:
+    def capture_buffer_data(self, sample_count: int = 1000, range_val: float = 2e-6) -> Optional[np.ndarray]:
         """
         高速采集数据到缓冲区
         :param sample_count: 采样点数
         :param range_val: 测量量程
-        :return: 采集的数据列表
+        :return: 采集的数据数组
         """
         if not self.configure_buffer(sample_count):
             return None
         
         try:
-            # 配置高速测量参数
-            self.set_current_range(range_val)
-            self.send_command("NPLC .01")  # 快速积分率（0.01PLC）
-            self.send_command("SYST:AZER:STAT OFF")  # 关闭自动清零
-            self.send_command("DISP:ENAB OFF")  # 关闭显示器节省资源
-            self.send_command(f"TRIG:COUN {sample_count}")  # 设置触发次数
-            self.send_command("TRIG:DEL 0")  # 触发延迟0秒
-            
-            # 开始采集
+            if range_val not in MEASURE_RANGE_SET:
+                print(f"无效量程，可选量程：{MEASURE_RANGES}")
+                return None
+            # 高速测量参数合并为一条复合消息下发，8次串口往返变1次
+            self.send_batch([
+                f"RANG {range_val:.9f}",
+                "NPLC .01",  # 快速积分率（0.01PLC）
+                "SYST:AZER:STAT OFF",  # 关闭自动清零
+                "DISP:ENAB OFF",  # 关闭显示器节省资源
+                f"TRIG:COUN {sample_count}",  # 设置触发次数
+                "TRIG:DEL 0",  # 触发延迟0秒
+                "INIT",  # 开始采集
+            ])
+            self._current_range = range_val
+
             print("开始高速采集...")
-            self.send_command("INIT")
-            # 等待采集完成（根据采样点数估算时间）
-            wait_time = sample_count * 0.001 + 1  # 1ms/点 + 缓冲时间
-            time.sleep(wait_time)
-            
+            # 用*OPC?等待采集真正完成，而不是按点数猜一个sleep
+            self.wait_opc(timeout=sample_count * 0.001 + 5.0)
+
             # 读取缓冲区数据
-            response = self.send_command("TRAC:DATA?", get_response=True)
+            response = self.send_bytes(CMD_TRAC_DATA, get_response=True)
             # 恢复显示
             self.send_command("DISP:ENAB ON")
             
             if response:
-                # 解析数据（逗号分隔）
-                data = [float(x.strip()) for x in response.split(",") if x.strip()]
+                # 逗号分隔的ASCII浮点直接交给numpy的C解析器，
+                # 免去逐点的Python float()循环
+                data = np.fromstring(response, sep=",")
                 print(f"采集完成，实际获取{len(data)}个数据点")
                 return data[:sample_count]  # 确保不超过请求点数
             return None
@@ -1,8 +1,10 @@
 
 import time
+import queue
 import logging
+import functools
 import threading
-from typing import Optional, Union
+from typing import List, Optional, Tuple, Union
 from collections import deque
 from datetime import datetime
 import logging
@@ -11,22 +13,145 @@ import threading
 import serial
 from serial.tools import list_ports
 
+from concurrent.futures import Future
+
+
+def enable_low_latency(serial_connection) -> None:
+    """尽力开启串口驱动的低延迟模式（与Ammeter_Control中的实现同源）
+
+    FTDI等USB转串口芯片默认有16ms的接收缓冲合并延迟；Linux下置
+    ASYNC_LOW_LATENCY可降到1-2ms，Windows下顺带放大驱动缓冲防止
+    快速查询时丢字节。不支持的平台/驱动静默跳过。
+    """
+    try:
+        import array
+        import fcntl
+        import termios
+        ASYNC_LOW_LATENCY = 0x2000
+        buf = array.array('i', [0] * 64)
+        fcntl.ioctl(serial_connection.fileno(), termios.TIOCGSERIAL, buf)
+        buf[4] |= ASYNC_LOW_LATENCY  # serial_struct.flags
+        fcntl.ioctl(serial_connection.fileno(), termios.TIOCSSERIAL, buf)
+    except Exception:
+        pass
+    try:
+        # pyserial仅在Windows上提供set_buffer_size
+        serial_connection.set_buffer_size(rx_size=1 << 16, tx_size=1 << 16)
+    except Exception:
+        pass
+
+
+def _parse_float(text) -> Optional[float]:
+    """数值响应的快速解析：失败返回None，热路径上不走异常日志机制"""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _encode_line(command: str) -> bytes:
+    """缓存命令的ASCII编码（含换行终止符），重复命令免去逐次编码"""
+    return f"{command}\n".encode('ascii')
+
+
+@functools.lru_cache(maxsize=64)
+def _encode_compound(commands: tuple) -> bytes:
+    """缓存复合查询行的编码，可直接接在选择前缀后。
+
+    非*命令以:回到根层级；*开头的IEEE 488.2通用命令不得带头部路径。
+    """
+    joined = ';'.join(
+        cmd if cmd.startswith('*') else ':' + cmd.lstrip(':')
+        for cmd in commands
+    )
+    return f"{joined}\n".encode('ascii')
+
+
+class _SerialIOService:
+    """每个串口一个专用I/O线程，调用方只入队请求、从不直接触碰串口。
+
+    单写者设计取代跨实例的互斥锁：热路径上没有锁竞争，请求按FIFO
+    顺序执行，设备选中状态(selected_address)归I/O线程独占管理。
+    """
+
+    _services = {}
+    _services_lock = threading.Lock()
+
+    @classmethod
+    def for_port(cls, serial_connection):
+        """返回该串口对应的服务实例（同一串口共享一个I/O线程）"""
+        with cls._services_lock:
+            # 清理已关闭串口对应的服务，避免反复重连累积线程
+            for key, stale in list(cls._services.items()):
+                if not getattr(stale.serial, 'is_open', False):
+                    stale.shutdown()
+                    del cls._services[key]
+            svc = cls._services.get(id(serial_connection))
+            if svc is None:
+                svc = cls(serial_connection)
+                cls._services[id(serial_connection)] = svc
+            return svc
+
+    def __init__(self, serial_connection) -> None:
+        self.serial = serial_connection
+        self.selected_address: Optional[int] = None
+        self._queue = queue.Queue()
+        self._closed = False
+        self._closed_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, job) -> Future:
+        """入队一个job(service)并返回Future，结果在I/O线程中产生。
+
+        服务已关闭时Future立即携带ConnectionError，调用方的.result()
+        不会永远挂起。
+        """
+        future = Future()
+        with self._closed_lock:
+            if self._closed:
+                future.set_exception(ConnectionError("串口I/O服务已关闭"))
+            else:
+                self._queue.put((job, future))
+        return future
+
+    def shutdown(self) -> None:
+        """结束I/O线程（串口关闭后由for_port的清理调用）"""
+        with self._closed_lock:
+            self._closed = True
+            self._queue.put(None)
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job, future = item
+            try:
+                future.set_result(job(self))
+            except Exception as e:
+                future.set_exception(e)
+        # 关闭后让仍在排队的请求立即失败，而不是让调用方无限等待
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(ConnectionError("串口I/O服务已关闭"))
 
 
 class TDKPowerSupply:
     """TDK电源控制类，通过RS232串口与电源通信"""
 
-    # 类级别的串口锁，确保多个电源实例不会同时访问串口
-    _serial_lock = threading.Lock()
-
     def __init__(self, address: int, serial_connection) -> None:
         self.address = address
         self.serial = serial_connection
+        self._io = _SerialIOService.for_port(serial_connection) if serial_connection else None
+        # 选择前缀只与地址有关，连接期间不变，编码一次即可
+        self._select_prefix = f"INSTrument:NSELect {address};".encode('ascii')
         self.logger = logging.getLogger(f'TDKPowerSupply_{address}')
-        # 设置日志级别为DEBUG以显示详细信息
-        self.logger.setLevel(logging.DEBUG)
-        # 每个电源实例有自己的操作锁
-        self._instance_lock = threading.Lock()
 
     def connect(self) -> bool:
         """检查串口是否连接"""
@@ -54,50 +179,84 @@ class TDKPowerSupply:
             self.logger.error("串口未连接")
             return None
 
-        # 使用类级别锁确保串口访问的线程安全
-        with TDKPowerSupply._serial_lock:
+        def job(svc):
+            # 地址选择与实际命令用;合并成一行SCPI发送，省去选择命令
+            # 后的固定等待；地址未变化时直接跳过选择前缀
             try:
-                # 清空输入输出缓冲区
-                self.serial.flushInput()
-                self.serial.flushOutput()
-
-                # 先选择设备地址
-                select_cmd = f"INSTrument:NSELect {self.address}\n"
-                self.serial.write(select_cmd.encode('ascii'))
-                time.sleep(0.1)  # 增加设备选择等待时间
-
-                # 发送实际命令
-                full_command = f"{command}\n"
-                self.serial.write(full_command.encode('ascii'))
-                self.logger.debug(f"发送命令: {full_command.strip()}")
-
-                # 如果需要响应，读取并返回
-                if get_response:
-                    time.sleep(0.15)  # 增加响应等待时间
-
-                    # 检查是否有数据可读
-                    if self.serial.in_waiting > 0:
-                        response = self.serial.read_until(b'\n').decode('ascii', errors='ignore').strip()
-                        self.logger.debug(f"收到响应: '{response}'")
-                        return response
+                payload = _encode_line(command)
+                if svc.selected_address != self.address:
+                    # ;之后的非*命令必须以:回到根层级，否则设备会按
+                    # INSTrument子树解析并报头部错误（与_encode_compound一致）
+                    if payload.startswith(b'*'):
+                        payload = self._select_prefix + payload
                     else:
-                        # 如果没有立即响应，再等待一下
-                        time.sleep(0.1)
-                        if self.serial.in_waiting > 0:
-                            response = self.serial.read(self.serial.in_waiting).decode('ascii', errors='ignore').strip()
-                            self.logger.debug(f"延迟收到响应: '{response}'")
-                            return response
-                        else:
-                            self.logger.debug("无响应数据")
-                            return ""
+                        payload = self._select_prefix + b':' + payload.lstrip(b':')
+                self.serial.write(payload)
+                svc.selected_address = self.address
+                self.logger.debug("发送命令: %s", payload)
+            except Exception:
+                # 出错后不再假定设备的选中状态
+                svc.selected_address = None
+                raise
+
+            # 如果需要响应，读取并返回：read_until在终止符到达后
+            # 立即返回，无需固定sleep；超时上限由串口timeout决定
+            if get_response:
+                # 先在bytes层strip再解码，少建两个中间字符串对象
+                response = self.serial.read_until(b'\n').strip().decode('ascii', errors='ignore')
+                if response:
+                    self.logger.debug("收到响应: '%s'", response)
                 else:
-                    # 设置命令，等待一下让设备处理
-                    time.sleep(0.05)
+                    self.logger.debug("无响应数据")
+                return response
+            return None
 
+        try:
+            return self._io.submit(job).result()
+        except Exception as e:
+            self.logger.error("地址%s命令发送失败: %s", self.address, e)
+            return None
+
+    def query_multi(self, *commands: str) -> Optional[List[str]]:
+        """
+        将多条查询命令合并为一次串口往返
+
+        Args:
+            commands: 若干SCPI查询命令
+
+        Returns:
+            与命令顺序一一对应的响应列表，失败返回None
+        """
+        if not self.serial or not self.serial.is_open:
+            self.logger.error("串口未连接")
+            return None
+
+        def job(svc):
+            # SCPI用;分隔的复合命令只需一次写入和一次读取
+            try:
+                payload = _encode_compound(commands)
+                if svc.selected_address != self.address:
+                    payload = self._select_prefix + payload
+                self.serial.write(payload)
+                svc.selected_address = self.address
+                self.logger.debug("发送命令: %s", payload)
+            except Exception:
+                svc.selected_address = None
+                raise
+
+            response = self.serial.read_until(b'\n').strip().decode('ascii', errors='ignore')
+            self.logger.debug("收到响应: '%s'", response)
+            parts = response.split(';')
+            if len(parts) != len(commands):
+                self.logger.error("地址%s复合查询响应数量不匹配: '%s'", self.address, response)
                 return None
-            except Exception as e:
-                self.logger.error(f"地址{self.address}命令发送失败: {str(e)}")
-                return None
+            return parts
+
+        try:
+            return self._io.submit(job).result()
+        except Exception as e:
+            self.logger.error("地址%s复合查询失败: %s", self.address, e)
+            return None
 
     def set_voltage(self, voltage: float) -> bool:
         """
@@ -109,16 +268,15 @@ class TDKPowerSupply:
         Returns:
             设置成功返回True，失败返回False
         """
-        with self._instance_lock:
-            self.logger.info(f"地址{self.address}: 设置电压 {voltage:.3f}V")
-            try:
-                cmd = f"VOLT:AMPL {voltage:.3f}"
-                self.send_command(cmd, get_response=False)
-                self.logger.debug(f"地址{self.address}: 发送电压命令 '{cmd}'")
-                return True
-            except Exception as e:
-                self.logger.error(f"地址{self.address}: 电压设置异常: {e}")
-                return False
+        self.logger.info("地址%s: 设置电压 %.3fV", self.address, voltage)
+        try:
+            cmd = f"VOLT:AMPL {voltage:.3f}"
+            self.send_command(cmd, get_response=False)
+            self.logger.debug("地址%s: 发送电压命令 '%s'", self.address, cmd)
+            return True
+        except Exception as e:
+            self.logger.error("地址%s: 电压设置异常: %s", self.address, e)
+            return False
 
     def set_current(self, current: float) -> bool:
         """
@@ -130,16 +288,15 @@ class TDKPowerSupply:
         Returns:
             设置成功返回True，失败返回False
         """
-        with self._instance_lock:
-            self.logger.info(f"地址{self.address}: 设置电流 {current:.3f}A")
-            try:
-                cmd = f"CURR:AMPL {current:.3f}"
-                self.send_command(cmd, get_response=False)
-                self.logger.debug(f"地址{self.address}: 发送电流命令 '{cmd}'")
-                return True
-            except Exception as e:
-                self.logger.error(f"地址{self.address}: 电流设置异常: {e}")
-                return False
+        self.logger.info("地址%s: 设置电流 %.3fA", self.address, current)
+        try:
+            cmd = f"CURR:AMPL {current:.3f}"
+            self.send_command(cmd, get_response=False)
+            self.logger.debug("地址%s: 发送电流命令 '%s'", self.address, cmd)
+            return True
+        except Exception as e:
+            self.logger.error("地址%s: 电流设置异常: %s", self.address, e)
+            return False
 
     def set_output(self, state: bool) -> bool:
         """
@@ -151,56 +308,57 @@ class TDKPowerSupply:
         Returns:
             设置成功返回True，失败返回False
         """
-        with self._instance_lock:
-            status = 1 if state else 0
-            self.logger.info(f"地址{self.address}: 设置输出{'开启' if state else '关闭'}")
-            try:
-                cmd = f"OUTP:STAT {status}"
-                self.send_command(cmd, get_response=False)
-                self.logger.debug(f"地址{self.address}: 发送输出命令 '{cmd}'")
-                return True
-            except Exception as e:
-                self.logger.error(f"地址{self.address}: 输出设置异常: {e}")
-                return False
+        status = 1 if state else 0
+        self.logger.info("地址%s: 设置输出%s", self.address, '开启' if state else '关闭')
+        try:
+            cmd = f"OUTP:STAT {status}"
+            self.send_command(cmd, get_response=False)
+            self.logger.debug("地址%s: 发送输出命令 '%s'", self.address, cmd)
+            return True
+        except Exception as e:
+            self.logger.error("地址%s: 输出设置异常: %s", self.address, e)
+            return False
 
     def get_voltage(self) -> Optional[float]:
         """获取当前设置的电压值"""
         response = self.send_command(":VOLT?", get_response=True)
-        if response and response.strip():
-            try:
-                return float(response)
-            except ValueError:
-                self.logger.error(f"解析设置电压值失败: {response}")
-        return None
+        value = _parse_float(response) if response else None
+        if value is None and response:
+            self.logger.debug("解析设置电压值失败: %s", response)
+        return value
 
     def get_current(self) -> Optional[float]:
         """获取当前设置的电流值"""
         response = self.send_command(":CURR?", get_response=True)
-        if response and response.strip():
-            try:
-                return float(response)
-            except ValueError:
-                self.logger.error(f"解析设置电流值失败: {response}")
-        return None
+        value = _parse_float(response) if response else None
+        if value is None and response:
+            self.logger.debug("解析设置电流值失败: %s", response)
+        return value
 
     def get_actual_voltage(self) -> Optional[float]:
         """获取实际输出电压值"""
         response = self.send_command("MEAS:VOLT?", get_response=True)
-        if response:
-            try:
-                return float(response)
-            except ValueError:
-                self.logger.error(f"解析实际电压值失败: {response}")
-        return None
+        value = _parse_float(response) if response else None
+        if value is None and response:
+            self.logger.debug("解析实际电压值失败: %s", response)
+        return value
 
     def get_actual_current(self) -> Optional[float]:
         """获取实际输出电流值"""
         response = self.send_command("MEAS:CURR?", get_response=True)
-        if response:
-            try:
-                return float(response)
-            except ValueError:
-                self.logger.error(f"解析实际电流值失败: {response}")
+        value = _parse_float(response) if response else None
+        if value is None and response:
+            self.logger.debug("解析实际电流值失败: %s", response)
+        return value
+
+    def get_actual_readings(self) -> Optional[Tuple[float, float]]:
+        """一次往返同时读取实际输出电压和电流"""
+        parts = self.query_multi("MEAS:VOLT?", "MEAS:CURR?")
+        if parts:
+            v, i = _parse_float(parts[0]), _parse_float(parts[1])
+            if v is not None and i is not None:
+                return v, i
+            self.logger.debug("解析实际电压/电流失败: %s", parts)
         return None
 
     def get_output_status(self) -> Optional[bool]:
@@ -210,7 +368,7 @@ class TDKPowerSupply:
             try:
                 return bool(int(response))
             except ValueError:
-                self.logger.error(f"解析输出状态失败: {response}")
+                self.logger.error("解析输出状态失败: %s", response)
         return None
 
     def get_id(self) -> Optional[str]:
@@ -220,43 +378,62 @@ class TDKPowerSupply:
     def test_communication(self) -> bool:
         """测试与电源的基本通信"""
         try:
-            # 尝试多个命令来测试通信
+            # 优先用一条复合查询探测（1次往返代替4次）
+            parts = self.query_multi("*IDN?", ":VOLT?", ":CURR?", "OUTP?")
+            if parts and any(p.strip() for p in parts):
+                self.logger.info("地址%s: 通信测试成功，复合查询响应: %s", self.address, parts)
+                return True
+
+            # 复合查询无响应时退回逐条探测
             test_commands = ["*IDN?", ":VOLT?", ":CURR?", "OUTP?"]
 
             for cmd in test_commands:
-                self.logger.debug(f"测试命令: {cmd}")
+                self.logger.debug("测试命令: %s", cmd)
                 response = self.send_command(cmd, get_response=True)
 
                 # 如果收到任何非空响应，说明通信成功
                 if response and response.strip():
-                    self.logger.info(f"地址{self.address}: 通信测试成功，命令 {cmd} 响应: {response}")
+                    self.logger.info("地址%s: 通信测试成功，命令 %s 响应: %s", self.address, cmd, response)
                     return True
 
             # 所有命令都没有响应
-            self.logger.warning(f"地址{self.address}: 通信测试失败 - 所有命令无响应")
+            self.logger.warning("地址%s: 通信测试失败 - 所有命令无响应", self.address)
             return False
 
         except Exception as e:
-            self.logger.error(f"地址{self.address}: 通信测试异常: {e}")
+            self.logger.error("地址%s: 通信测试异常: %s", self.address, e)
             return False
 
     def debug_power_settings(self) -> dict:
-        """调试电源设置，返回所有状态信息"""
+        """调试电源设置，返回所有状态信息（合并为一次查询往返）"""
         debug_info = {}
+
+        def _to_float(text):
+            try:
+                return float(text)
+            except (TypeError, ValueError):
+                return None
+
         try:
-            debug_info['device_id'] = self.get_id()
-            debug_info['voltage_setting'] = self.get_voltage()
-            debug_info['current_setting'] = self.get_current()
-            debug_info['actual_voltage'] = self.get_actual_voltage()
-            debug_info['actual_current'] = self.get_actual_current()
-            debug_info['output_status'] = self.get_output_status()
-
-            self.logger.info(f"地址{self.address} 调试信息: {debug_info}")
+            parts = self.query_multi("*IDN?", ":VOLT?", ":CURR?",
+                                     "MEAS:VOLT?", "MEAS:CURR?", "OUTP?")
+            if parts:
+                debug_info['device_id'] = parts[0]
+                debug_info['voltage_setting'] = _to_float(parts[1])
+                debug_info['current_setting'] = _to_float(parts[2])
+                debug_info['actual_voltage'] = _to_float(parts[3])
+                debug_info['actual_current'] = _to_float(parts[4])
+                status = _to_float(parts[5])
+                debug_info['output_status'] = bool(int(status)) if status is not None else None
+
+            self.logger.info("地址%s 调试信息: %s", self.address, debug_info)
             return debug_info
         except Exception as e:
-            self.logger.error(f"地址{self.address} 调试信息获取失败: {e}")
+            self.logger.error("地址%s 调试信息获取失败: %s", self.address, e)
             return {}
 
     def reset(self) -> None:
-        """重置电源到默认状态"""
-        self.send_command("*RST", get_response=False)
\ No newline at end of file
+        """重置电源到默认状态，用*OPC?等待设备真正完成复位"""
+        self.send_command("*RST", get_response=False)
+        # 设备在复位完成后才应答*OPC?，比固定sleep更准确
+        self.send_command("*OPC?", get_response=True)
\ No newline at end of file
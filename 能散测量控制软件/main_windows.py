@@ -3,28 +3,29 @@ import sys
 import json
 import csv
 import time
+import queue
 import threading
 
+import serial
+
 import numpy as np
 
+from collections import deque
 from datetime import datetime
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout,
                              QVBoxLayout, QGridLayout, QGroupBox, QLabel,
                              QLineEdit, QPushButton, QMessageBox, QFileDialog,
-                             QTextEdit, QSizePolicy, QComboBox)
+                             QTextEdit, QPlainTextEdit, QSizePolicy, QComboBox,
+                             QSpinBox)
 from PyQt5.QtCore import Qt, pyqtSignal, QObject, pyqtSlot
 from PyQt5.QtGui import QFont
 
-import matplotlib
-from matplotlib import pyplot as plt
-
-matplotlib.use('Qt5Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+# matplotlib较重（数百毫秒启动成本），延迟到构建画布时再导入，
+# 只为使用设备控制类而import本模块时不付这笔开销
 
 # 假设原控制类在同一目录
-from TDK_Control import TDKPowerSupply
+from TDK_Control import TDKPowerSupply, enable_low_latency
 from Ammeter_Control import KeithleyPicoammeter
 
 
@@ -32,6 +33,9 @@ from Ammeter_Control import KeithleyPicoammeter
 class SigEmitter(QObject):
     append_data = pyqtSignal(tuple)
     update_display = pyqtSignal(dict)  # 用于更新电源显示数据
+    notify = pyqtSignal(str, str, str)  # 工作线程请求弹出提示(级别,标题,内容)
+    amm_connected = pyqtSignal(bool)  # 皮安表连接结果
+    status = pyqtSignal(str)  # 状态栏消息（测量结果等非阻塞反馈）
 
 
 class MainWindow(QMainWindow):
@@ -48,15 +52,34 @@ class MainWindow(QMainWindow):
         self.tdk_fcup = None  # 法拉第杯抑制电源 (COM11-6)
         self.ser21 = None  # 共享串口 COM21
         self.amm = None
-        self.data = []
+        # 测量记录存在按倍增扩容的numpy结构化数组里（24B/行，连续内存），
+        # 时间戳另存列表；长时间运行不再堆积百万级Python元组
+        self._arr = np.empty(1024, dtype=[('v', 'f8'), ('i', 'f8')])
+        self._n = 0
+        self._ts_list = []
         self._stop_event = threading.Event()
         self._cont_stop_event = threading.Event()
         self._amm_lock = threading.Lock()  # 避免多线程读取皮安表互相干扰
+        self._last_ts_sec = 0  # 日志时间戳按秒缓存
+        self._last_ts_str = ''
+        self._last_display = {}  # 上次已显示的电源读数，避免重复setText
+        # 日志先进有界缓冲，由GUI定时器批量刷入终端：工作线程不再直接
+        # 触碰Qt控件，高频日志也只触发一次追加/重绘
+        self._log_buf = deque(maxlen=2000)
+        self._open_dialogs = set()  # 正在显示的(级别,标题)，避免对话框刷屏
+
+        # 电源设置命令经队列交给工作线程执行，GUI点击不再阻塞在串口I/O上；
+        # 队列按入队顺序执行，与显示轮询通过串口锁自然互斥
+        self._cmd_queue = queue.Queue()
+        threading.Thread(target=self._cmd_worker, daemon=True).start()
 
         # 信号
         self.sig = SigEmitter()
         self.sig.append_data.connect(self._on_append_data)
         self.sig.update_display.connect(self._apply_display_data)
+        self.sig.notify.connect(self._notify)
+        self.sig.amm_connected.connect(self._on_amm_connected)
+        self.sig.status.connect(lambda msg: self.statusBar().showMessage(msg, 5000))
 
         # 构建 UI
         self._build_ui()
@@ -65,7 +88,16 @@ class MainWindow(QMainWindow):
         from PyQt5.QtCore import QTimer
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self._schedule_display_update)
-        self.update_timer.start(1000)  # 每1000ms更新一次
+        self.update_timer.start(self.poll_interval_spin.value())  # 间隔由刷新间隔(ms)控制
+        self._log_timer = QTimer()
+        self._log_timer.timeout.connect(self._flush_log)
+        self._log_timer.start(100)
+        # 测量点先进deque，按帧批量入表重绘：重绘频率封顶~33Hz，
+        # 采样线程不再为每个点排队一次Qt事件
+        self._pending = deque()
+        self._plot_timer = QTimer()
+        self._plot_timer.timeout.connect(self._drain_pending)
+        self._plot_timer.start(30)
         self._updating_display = False  # 防止重复更新
 
     # ---------------- UI 构建 ----------------
@@ -274,9 +306,12 @@ class MainWindow(QMainWindow):
         col.addWidget(g3, 0)
         col.addWidget(g4, 0)
         # 输出终端放在左列底部，占满剩余高度
-        self.terminal = QTextEdit()
+        # QPlainTextEdit按行块存储，追加为O(1)；限制最大行数形成环形
+        # 缓冲，长时间运行不会因日志堆积拖慢界面重排
+        self.terminal = QPlainTextEdit()
         self.terminal.setReadOnly(True)
         self.terminal.setPlaceholderText('输出终端')
+        self.terminal.setMaximumBlockCount(1000)
         self.terminal.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         col.addWidget(self.terminal, 1)
         return col
@@ -289,6 +324,14 @@ class MainWindow(QMainWindow):
         hint = QLabel('提示: 清空图片也会清空数据')
         hint.setStyleSheet('color: #666; font-size: 12px;')
         lo.addWidget(hint)
+        # 电源显示刷新间隔：串口读取改为事件驱动后可以明显快于1s
+        lo.addWidget(QLabel('刷新间隔(ms)'))
+        self.poll_interval_spin = QSpinBox()
+        self.poll_interval_spin.setRange(100, 5000)
+        self.poll_interval_spin.setSingleStep(100)
+        self.poll_interval_spin.setValue(500)
+        self.poll_interval_spin.valueChanged.connect(lambda ms: self.update_timer.setInterval(ms))
+        lo.addWidget(self.poll_interval_spin)
         lo.addStretch()
         return lo
 
@@ -336,13 +379,41 @@ class MainWindow(QMainWindow):
 
     # ---------- 绘图 ----------
     def _build_canvas(self):
+        import matplotlib
+        matplotlib.use('Qt5Agg')
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
         self.fig = Figure(figsize=(8, 5), dpi=100)
         self.ax = self.fig.add_subplot(111)
         self.ax.set_xlabel('Measure point')
         self.ax.set_ylabel('Current (A)')
         self.ax.ticklabel_format(style='scientific', scilimits=(0,0), axis='y', useOffset=False)
         self.line, = self.ax.plot([], [], '-o', markersize=4)
-        return FigureCanvas(self.fig)
+        # 曲线数据放在按倍增扩容的numpy数组里，set_data拿到的是零拷贝切片；
+        # 绘图用float32足够（像素精度），CSV导出仍用_arr里的float64原值
+        self._plot_y = np.empty(256, dtype=np.float32)
+        self._plot_x = np.arange(1.0, len(self._plot_y) + 1, dtype=np.float32)  # 测量点序号
+        self._plot_n = 0
+        self._plot_bg = None  # blit背景缓存，坐标范围变化/窗口缩放时失效
+        # 增量维护的电流极值，设定坐标范围时无需relim重扫全部数据
+        self._ymin, self._ymax = np.inf, -np.inf
+        self.line.set_animated(True)
+        canvas = FigureCanvas(self.fig)
+        canvas.mpl_connect('resize_event', lambda event: setattr(self, '_plot_bg', None))
+        canvas.mpl_connect('draw_event', self._on_canvas_draw)
+        return canvas
+
+    def _on_canvas_draw(self, event):
+        """每次完整重绘后重新截取blit背景并补画曲线。
+
+        线条是animated的，普通draw()不渲染它；窗口缩放/曝光触发的
+        重绘若不在这里补画，空闲时缩放会让曲线消失到下一个采样点。
+        """
+        self._plot_bg = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        if self._plot_n:
+            self.ax.draw_artist(self.line)
+            self.fig.canvas.blit(self.ax.bbox)
 
     # ---------------- 原函数名完全一致 ----------------
     def connect_power(self):
@@ -350,30 +421,34 @@ class MainWindow(QMainWindow):
         addr = int(self.pwr_addr.text().strip() or '1')
         if not port:
             return QMessageBox.warning(self, '提示', '请填写电源串口')
+        lens_addr = int(self.lens_addr.text().strip() or '6')
+        # 打开串口和通信测试都可能阻塞，交给命令工作线程执行
+        self._enqueue_cmd(self._connect_power_worker, port, addr, lens_addr)
+
+    def _connect_power_worker(self, port, addr, lens_addr):
         ser = None
         try:
-            import serial
             if self.ser21 and getattr(self.ser21, 'is_open', False) and self.ser21.port == port:
                 ser = self.ser21
             else:
-                ser = serial.Serial(port, baudrate=9600, timeout=0.5)
+                ser = serial.Serial(port, baudrate=9600, timeout=0.2, write_timeout=0.2)
+                enable_low_latency(ser)
                 # 仅在 COM21 共享
                 if port.lower() == 'com21':
                     self.ser21 = ser
             self.tdk = TDKPowerSupply(addr, ser)
         except Exception as e:
-            return QMessageBox.critical(self, '串口打开失败', str(e))
+            return self.sig.notify.emit('error', '串口打开失败', str(e))
         ok = False
         try:
             ok = self.tdk.test_communication()
         except Exception:
             pass
-        QMessageBox.information(self, '连接电源', '通信成功' if ok else '通信可能失败，请检查')
+        self.sig.notify.emit('info', '连接电源', '通信成功' if ok else '通信可能失败，请检查')
         self.log(f'连接主电源 port={port}, addr={addr}, ok={ok}')
         # 同口连锁：自动准备透镜电源实例
         if port.lower() == 'com21' and self.tdk_lens is None:
             try:
-                lens_addr = int(self.lens_addr.text().strip() or '6')
                 self.tdk_lens = TDKPowerSupply(lens_addr, ser or self.ser21)
                 self.log(f'连锁自动创建透镜电源 addr={lens_addr}')
             except Exception:
@@ -403,10 +478,18 @@ class MainWindow(QMainWindow):
         port = self.amm_port.text().strip()
         if not port:
             return QMessageBox.warning(self, '提示', '请填写安培表串口')
+        # 皮安表连接含0.5s的上电稳定等待，放到工作线程
+        self._enqueue_cmd(self._connect_amm_worker, port)
+
+    def _connect_amm_worker(self, port):
         self.amm = KeithleyPicoammeter(port)
         ok = self.amm.connect()
-        QMessageBox.information(self, '连接安培表', '连接成功' if ok else '连接失败')
         self.log(f'连接皮安表 port={port}, ok={ok}')
+        self.sig.amm_connected.emit(ok)
+
+    @pyqtSlot(bool)
+    def _on_amm_connected(self, ok):
+        self._notify('info', '连接安培表', '连接成功' if ok else '连接失败')
         if ok:
             # 成功重连后清空数据与图像
             self.clear_plot()
@@ -418,22 +501,52 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, '断开', '安培表已断开')
             self.log('皮安表已断开')
 
+    def _notify(self, level: str, title: str, msg: str):
+        """非阻塞提示：先写日志；同一(级别,标题)的对话框最多同时一个。
+
+        QMessageBox.exec会开嵌套事件循环，高频路径上会把界面和命令
+        队列一起卡住；这里用show()非模态显示。
+        """
+        self.log(f'{title}: {msg}')
+        key = (level, title)
+        if key in self._open_dialogs:
+            return
+        icon = {'warning': QMessageBox.Warning,
+                'error': QMessageBox.Critical}.get(level, QMessageBox.Information)
+        box = QMessageBox(icon, title, msg, QMessageBox.Ok, self)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        self._open_dialogs.add(key)
+        box.finished.connect(lambda _=None, k=key: self._open_dialogs.discard(k))
+        box.show()
+
+    def _cmd_worker(self):
+        """后台按序执行电源设置命令，GUI点击只入队不阻塞"""
+        while True:
+            func, args = self._cmd_queue.get()
+            try:
+                func(*args)
+            except Exception:
+                pass
+
+    def _enqueue_cmd(self, func, *args):
+        self._cmd_queue.put((func, args))
+
     def set_voltage_current(self):
         if not self.tdk:
-            return QMessageBox.warning(self, '未连接', '请先连接电源')
+            return self._notify('warning', '未连接', '请先连接电源')
         try:
             v = float(self.voltage_entry.text())
             i = float(self.current_entry.text())
         except Exception:
-            return QMessageBox.critical(self, '错误', '无效电压或电流值')
-        self.tdk.set_voltage(v)
-        self.tdk.set_current(i)
+            return self._notify('error', '错误', '无效电压或电流值')
+        self._enqueue_cmd(self.tdk.set_voltage, v)
+        self._enqueue_cmd(self.tdk.set_current, i)
         self.log(f'主电源设定 电压{v}V 电流{i}A')
 
     def set_output(self, state: bool):
         if not self.tdk:
-            return QMessageBox.warning(self, '未连接', '请先连接电源')
-        self.tdk.set_output(state)
+            return self._notify('warning', '未连接', '请先连接电源')
+        self._enqueue_cmd(self.tdk.set_output, state)
         self.log(f'主电源输出 {"ON" if state else "OFF"}')
 
     # -------- 透镜电源 (21-6) --------
@@ -442,29 +555,32 @@ class MainWindow(QMainWindow):
         addr = int(self.lens_addr.text().strip() or '6')
         if not port:
             return QMessageBox.warning(self, '提示', '请填写透镜电源串口')
+        main_addr = int(self.pwr_addr.text().strip() or '7')
+        self._enqueue_cmd(self._connect_lens_worker, port, addr, main_addr)
+
+    def _connect_lens_worker(self, port, addr, main_addr):
         ser = None
         try:
-            import serial
             if self.ser21 and getattr(self.ser21, 'is_open', False) and self.ser21.port == port:
                 ser = self.ser21
             else:
-                ser = serial.Serial(port, baudrate=9600, timeout=0.5)
+                ser = serial.Serial(port, baudrate=9600, timeout=0.2, write_timeout=0.2)
+                enable_low_latency(ser)
                 if port.lower() == 'com21':
                     self.ser21 = ser
             self.tdk_lens = TDKPowerSupply(addr, ser)
         except Exception as e:
-            return QMessageBox.critical(self, '串口打开失败', str(e))
+            return self.sig.notify.emit('error', '串口打开失败', str(e))
         ok = False
         try:
             ok = self.tdk_lens.test_communication()
         except Exception:
             pass
-        QMessageBox.information(self, '连接透镜电源', '通信成功' if ok else '通信可能失败，请检查')
+        self.sig.notify.emit('info', '连接透镜电源', '通信成功' if ok else '通信可能失败，请检查')
         self.log(f'连接透镜电源 port={port}, addr={addr}, ok={ok}')
         # 同口连锁：自动准备主电源实例
         if port.lower() == 'com21' and self.tdk is None:
             try:
-                main_addr = int(self.pwr_addr.text().strip() or '7')
                 self.tdk = TDKPowerSupply(main_addr, ser or self.ser21)
                 self.log(f'连锁自动创建主电源 addr={main_addr}')
             except Exception:
@@ -491,20 +607,20 @@ class MainWindow(QMainWindow):
 
     def set_lens_voltage_current(self):
         if not self.tdk_lens:
-            return QMessageBox.warning(self, '未连接', '请先连接透镜电源')
+            return self._notify('warning', '未连接', '请先连接透镜电源')
         try:
             v = float(self.lens_v.text())
             i = float(self.lens_i.text())
         except Exception:
-            return QMessageBox.critical(self, '错误', '无效电压或电流值')
-        self.tdk_lens.set_voltage(v)
-        self.tdk_lens.set_current(i)
+            return self._notify('error', '错误', '无效电压或电流值')
+        self._enqueue_cmd(self.tdk_lens.set_voltage, v)
+        self._enqueue_cmd(self.tdk_lens.set_current, i)
         self.log(f'透镜电源设定 电压{v}V 电流{i}A')
 
     def set_lens_output(self, state: bool):
         if not self.tdk_lens:
-            return QMessageBox.warning(self, '未连接', '请先连接透镜电源')
-        self.tdk_lens.set_output(state)
+            return self._notify('warning', '未连接', '请先连接透镜电源')
+        self._enqueue_cmd(self.tdk_lens.set_output, state)
         self.log(f'透镜电源输出 {"ON" if state else "OFF"}')
 
     # -------- 法拉第杯抑制电源 (11-6) --------
@@ -513,14 +629,17 @@ class MainWindow(QMainWindow):
         addr = int(self.fcup_addr.text().strip() or '6')
         if not port:
             return QMessageBox.warning(self, '提示', '请填写抑制电源串口')
+        self._enqueue_cmd(self._connect_fcup_worker, port, addr)
+
+    def _connect_fcup_worker(self, port, addr):
         try:
-            import serial
-            ser = serial.Serial(port, baudrate=9600, timeout=0.5)
+            ser = serial.Serial(port, baudrate=9600, timeout=0.2, write_timeout=0.2)
+            enable_low_latency(ser)
         except Exception as e:
-            return QMessageBox.critical(self, '串口打开失败', str(e))
+            return self.sig.notify.emit('error', '串口打开失败', str(e))
         self.tdk_fcup = TDKPowerSupply(addr, ser)
         ok = self.tdk_fcup.test_communication()
-        QMessageBox.information(self, '连接抑制电源', '通信成功' if ok else '通信可能失败，请检查')
+        self.sig.notify.emit('info', '连接抑制电源', '通信成功' if ok else '通信可能失败，请检查')
         self.log(f'连接抑制电源 port={port}, addr={addr}, ok={ok}')
 
     def disconnect_fcup(self):
@@ -532,20 +651,20 @@ class MainWindow(QMainWindow):
 
     def set_fcup_voltage_current(self):
         if not self.tdk_fcup:
-            return QMessageBox.warning(self, '未连接', '请先连接抑制电源')
+            return self._notify('warning', '未连接', '请先连接抑制电源')
         try:
             v = float(self.fcup_v.text())
             i = float(self.fcup_i.text())
         except Exception:
-            return QMessageBox.critical(self, '错误', '无效电压或电流值')
-        self.tdk_fcup.set_voltage(v)
-        self.tdk_fcup.set_current(i)
+            return self._notify('error', '错误', '无效电压或电流值')
+        self._enqueue_cmd(self.tdk_fcup.set_voltage, v)
+        self._enqueue_cmd(self.tdk_fcup.set_current, i)
         self.log(f'抑制电源设定 电压{v}V 电流{i}A')
 
     def set_fcup_output(self, state: bool):
         if not self.tdk_fcup:
-            return QMessageBox.warning(self, '未连接', '请先连接抑制电源')
-        self.tdk_fcup.set_output(state)
+            return self._notify('warning', '未连接', '请先连接抑制电源')
+        self._enqueue_cmd(self.tdk_fcup.set_output, state)
         self.log(f'抑制电源输出 {"ON" if state else "OFF"}')
 
     def apply_range(self):
@@ -554,7 +673,7 @@ class MainWindow(QMainWindow):
 
     def prepare_measure(self):
         if not self.amm:
-            return QMessageBox.warning(self, '未连接', '请先连接安培表')
+            return self._notify('warning', '未连接', '请先连接安培表')
         rng_text = self.amm_range_combo.currentText().strip()
         if rng_text == '自动':
             cmds = ["*RST", "SYST:ACH ON", "RANG 2e-9", "INIT", "SYST:ZCOR:ACQ",
@@ -562,26 +681,43 @@ class MainWindow(QMainWindow):
         else:
             cmds = ["*RST", "SYST:ACH ON", f"RANG {rng_text}",  "INIT", "SYST:ZCOR:ACQ",
                     "SYST:ZCOR ON", "SYST:ZCH OFF"]
-        for c in cmds:
-            self.amm.send_command(c)
-            time.sleep(0.05)
-        QMessageBox.information(self, '准备', '已发送准备测量命令')
-        self.log(f'prepare_measure: sent preparation commands, range={rng_text}')
+        # 准备命令序列交给命令工作线程发送，GUI不阻塞在串口I/O上；
+        # 确认走状态栏而不是模态对话框
+        self._enqueue_cmd(self._prepare_worker, cmds, rng_text)
+        self.statusBar().showMessage(f'已发送准备测量命令 (量程: {rng_text})', 5000)
+
+    def _prepare_worker(self, cmds, rng_text):
+        # 整个序列并成一条;分隔的复合消息，8次往返合并为1次写入；
+        # 设备按顺序执行，*OPC?在全部完成（含零点校正采集）时才应答
+        self.amm.send_batch(cmds)
+        ok = self.amm.wait_opc()
+        self.log(f'prepare_measure: sent preparation commands, range={rng_text}, done={ok}')
+        # 批量下发的设置命令没有逐条响应，结束后查一次错误队列兜底
+        err = self.amm.get_error_status()
+        if err and not err.lstrip('+').startswith('0'):
+            self.log(f'prepare_measure: 设备报告错误: {err}')
 
     def single_measure(self):
         if not self.amm:
-            return QMessageBox.warning(self, '未连接', '请先连接安培表')
+            return self._notify('warning', '未连接', '请先连接安培表')
+        # 测量在命令工作线程执行，结果经信号回到GUI线程
+        self._enqueue_cmd(self._single_measure_worker)
+
+    def _single_measure_worker(self):
         with self._amm_lock:
             val = self.amm.measure_current()
         if val is None:
-            return QMessageBox.critical(self, '测量失败', '未能读取电流')
+            self.log('单次测量失败: 未能读取电流')
+            self.sig.status.emit('单次测量失败: 未能读取电流')
+            return
         volt = self.tdk.get_actual_voltage() if self.tdk else None
-        self.sig.append_data.emit((volt, val, datetime.now().isoformat()))
+        self._post_sample((volt, val, time.time_ns()))
         self.log(f'单次测量完成: I={val}')
+        self.sig.status.emit(f'单次测量: I={val:.3e} A')
 
     def start_measure(self):
         if not self.amm:
-            return QMessageBox.warning(self, '未连接', '请先连接安培表')
+            return self._notify('warning', '未连接', '请先连接安培表')
         try:
             steps = int(self.measure_steps.text())
             interval = float(self.measure_interval.text())
@@ -598,7 +734,7 @@ class MainWindow(QMainWindow):
             with self._amm_lock:
                 val = self.amm.measure_current()
             volt = self.tdk.get_actual_voltage() if self.tdk else None
-            self.sig.append_data.emit((volt, val, datetime.now().isoformat()))
+            self._post_sample((volt, val, time.time_ns()))
             self.log(f'连续测量: V={volt} I={val}')
             # 使用Event.wait()替代循环sleep，响应更快
             if self._cont_stop_event.wait(interval) or self._stop_event.is_set():
@@ -606,12 +742,12 @@ class MainWindow(QMainWindow):
 
     def stop_continuous_measure(self):
         self._cont_stop_event.set()
-        QMessageBox.information(self, '停止', '已停止当前皮安表连续测量')
+        self._notify('info', '停止', '已停止当前皮安表连续测量')
         self.log('已请求停止连续测量')
 
     def start_step_and_measure(self):
         if not (self.tdk and self.amm):
-            return QMessageBox.warning(self, '未连接', '请先连接电源与安培表')
+            return self._notify('warning', '未连接', '请先连接电源与安培表')
         try:
             # 起始电压去除：从当前电压开始（优先实际输出，其次输入框）
             start = self.tdk.get_actual_voltage()
@@ -620,7 +756,7 @@ class MainWindow(QMainWindow):
             stop, step, step_time = map(float, (self.stop_v.text(), self.step_v.text(), self.step_time.text()))
         except Exception:
             return QMessageBox.critical(self, '错误', '请填写有效的步进参数')
-        if (stop - start) * step < 0:
+        if step == 0 or (stop - start) * step < 0:
             return QMessageBox.critical(self, '错误', '步长方向与起止不匹配')
         self._stop_event.clear()
         self.log(f'开始阶梯输出 start={start}, stop={stop}, step={step}, hold={step_time}s')
@@ -628,17 +764,21 @@ class MainWindow(QMainWindow):
                          args=(start, stop, step, step_time), daemon=True).start()
 
     def _step_and_measure_thread(self, start, stop, step, step_time):
-        volt, ascending = start, step > 0
-        eps = 1e-12
-        while True:
-            # 超界直接退出
-            if (ascending and volt > stop + eps) or (not ascending and volt < stop - eps):
-                break
+        # 步进序列一次性算好：避免浮点逐步累加的漂移，终止电压必定包含，
+        # 总步数也先于执行可知
+        count = int(np.floor(abs((stop - start) / step))) + 1
+        volts = start + step * np.arange(count)
+        if not np.isclose(volts[-1], stop):
+            volts = np.append(volts, stop)
+        self.log(f'阶梯序列共{len(volts)}步')
+        for volt in volts:
+            volt = float(volt)
             if self._stop_event.is_set():
                 break
             step_start = time.perf_counter()
             self.tdk.set_voltage(volt)
-            time.sleep(0.05)  # 简短稳压时间计入总步长
+            if self._stop_event.wait(0.05):  # 简短稳压时间计入总步长
+                break
             # 在步长的 1/2 处再测一次，使用Event.wait优化
             mid_delay = step_time / 2.0
             if self._stop_event.wait(mid_delay):
@@ -655,10 +795,11 @@ class MainWindow(QMainWindow):
                     if mid_attempts >= 10:
                         self.log(f'阶梯中点测量失败, V={volt}, 尝试{mid_attempts}次')
                         break
-                    time.sleep(0.1)
+                    if self._stop_event.wait(0.1):
+                        break
             if mid_cur is None:
                 break
-            self.sig.append_data.emit((volt, mid_cur, datetime.now().isoformat()))
+            self._post_sample((volt, mid_cur, time.time_ns()))
             self.log(f'阶梯测量: V={volt} I={mid_cur}')
             # 使用Event.wait等待剩余时间
             elapsed = time.perf_counter() - step_start
@@ -666,28 +807,32 @@ class MainWindow(QMainWindow):
             if remaining > 0:
                 if self._stop_event.wait(remaining):
                     break
-            # 计算下一步，避免跨过终止值，确保终止值也执行
-            next_vol = volt + step
-            if ascending and next_vol > stop:
-                next_vol = stop
-            if (not ascending) and next_vol < stop:
-                next_vol = stop
-            # 若当前已经是终止值，完成后退出
-            if abs(volt - stop) <= eps:
-                break
-            volt = next_vol
 
     def stop_operations(self):
         self._stop_event.set()
-        QMessageBox.information(self, '停止', '已请求停止操作')
+        self._notify('info', '停止', '已请求停止操作')
         self.log('已请求停止所有操作')
 
     def log(self, msg: str):
-        """Append a timestamped message to the output terminal."""
-        if not hasattr(self, 'terminal') or self.terminal is None:
+        """Append a timestamped message to the output terminal.
+
+        线程安全：任意线程只写入deque，控件由GUI定时器批量刷新。
+        """
+        # 时间戳精确到秒，同一秒内的日志复用已格式化的字符串
+        sec = int(time.time())
+        if sec != self._last_ts_sec:
+            self._last_ts_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))
+            self._last_ts_sec = sec
+        self._log_buf.append(f"[{self._last_ts_str}] {msg}")
+
+    def _flush_log(self):
+        """GUI线程：把积攒的日志一次性追加到终端"""
+        if not self._log_buf or not hasattr(self, 'terminal') or self.terminal is None:
             return
-        ts = datetime.now().isoformat(sep=' ', timespec='seconds')
-        self.terminal.append(f"[{ts}] {msg}")
+        lines = []
+        while self._log_buf:
+            lines.append(self._log_buf.popleft())
+        self.terminal.appendPlainText('\n'.join(lines))
 
     # -------------- 更新电源显示 --------------
     def _schedule_display_update(self):
@@ -700,32 +845,15 @@ class MainWindow(QMainWindow):
     def _update_power_displays_background(self):
         """后台线程读取电源数据"""
         data = {}
-        try:
-            if self.tdk:
-                v = self.tdk.get_actual_voltage()
-                i = self.tdk.get_actual_current()
-                if v is not None and i is not None:
-                    data['pwr'] = (v, i)
-        except Exception:
-            pass
-        
-        try:
-            if self.tdk_lens:
-                v = self.tdk_lens.get_actual_voltage()
-                i = self.tdk_lens.get_actual_current()
-                if v is not None and i is not None:
-                    data['lens'] = (v, i)
-        except Exception:
-            pass
-        
-        try:
-            if self.tdk_fcup:
-                v = self.tdk_fcup.get_actual_voltage()
-                i = self.tdk_fcup.get_actual_current()
-                if v is not None and i is not None:
-                    data['fcup'] = (v, i)
-        except Exception:
-            pass
+        # 每个电源的电压/电流用复合查询一次往返读回
+        for key, psu in (('pwr', self.tdk), ('lens', self.tdk_lens), ('fcup', self.tdk_fcup)):
+            try:
+                if psu:
+                    readings = psu.get_actual_readings()
+                    if readings is not None:
+                        data[key] = readings
+            except Exception:
+                pass
         
         # 使用信号更新UI（线程安全）
         if data:
@@ -734,66 +862,119 @@ class MainWindow(QMainWindow):
     
     @pyqtSlot(dict)
     def _apply_display_data(self, data):
-        """在主线程中更新显示（槽函数）"""
-        if 'pwr' in data:
-            v, i = data['pwr']
-            self.pwr_actual_v.setText(f'电压: {v:.3f} V')
-            self.pwr_actual_i.setText(f'电流: {i:.3f} A')
-        if 'lens' in data:
-            v, i = data['lens']
-            self.lens_actual_v.setText(f'电压: {v:.3f} V')
-            self.lens_actual_i.setText(f'电流: {i:.3f} A')
-        if 'fcup' in data:
-            v, i = data['fcup']
-            self.fcup_actual_v.setText(f'电压: {v:.3f} V')
-            self.fcup_actual_i.setText(f'电流: {i:.3f} A')
+        """在主线程中更新显示（槽函数）；读数未变化时跳过setText避免重绘"""
+        labels = {'pwr': (self.pwr_actual_v, self.pwr_actual_i),
+                  'lens': (self.lens_actual_v, self.lens_actual_i),
+                  'fcup': (self.fcup_actual_v, self.fcup_actual_i)}
+        for key, readings in data.items():
+            if self._last_display.get(key) == readings:
+                continue
+            self._last_display[key] = readings
+            v, i = readings
+            label_v, label_i = labels[key]
+            label_v.setText(f'电压: {v:.3f} V')
+            label_i.setText(f'电流: {i:.3f} A')
 
     # -------------- 数据 & 绘图 --------------
-    def _on_append_data(self, tup):
-        self.data.append(tup)
+    def _post_sample(self, tup):
+        """工作线程提交测量点（线程安全，只入队不触碰Qt对象）"""
+        self._pending.append(tup)
+
+    def _drain_pending(self):
+        """GUI定时器：批量消化积攒的测量点，每帧只重绘一次"""
+        if not self._pending:
+            return
+        while self._pending:
+            self._ingest(self._pending.popleft())
+        self._update_plot()
+
+    def _ingest(self, tup):
         try:
             v, cur, ts = tup
-            self.log(f"测量数据: time={ts}, V={v}, I={cur}")
         except Exception:
-            pass
+            return
+        if self._n == len(self._arr):
+            self._arr = np.resize(self._arr, len(self._arr) * 2)
+        rec = self._arr[self._n]
+        rec['v'] = np.nan if v is None else v
+        rec['i'] = np.nan if cur is None else cur
+        self._ts_list.append(ts)
+        self._n += 1
+        self.log(f"测量数据: V={v}, I={cur}")
+        if cur is not None:
+            if self._plot_n == len(self._plot_y):
+                self._plot_y = np.resize(self._plot_y, len(self._plot_y) * 2)
+                self._plot_x = np.arange(1.0, len(self._plot_y) + 1, dtype=np.float32)
+            self._plot_y[self._plot_n] = cur
+            self._plot_n += 1
+            if cur < self._ymin:
+                self._ymin = cur
+            if cur > self._ymax:
+                self._ymax = cur
+
+    def _on_append_data(self, tup):
+        # 兼容append_data信号的旧路径
+        self._ingest(tup)
         self._update_plot()
 
 
     def _update_plot(self):
-        # x 轴为测量点序号，y 轴为电流
-        indices, currents = [], []
-        for v, cur, ts in self.data:
-            if cur is None:
-                continue
-            indices.append(len(indices) + 1)
-            currents.append(cur)
-        if not indices:
+        if not self._plot_n:
             return
-        self.line.set_data(indices, currents)
-        self.ax.relim()
-        self.ax.autoscale_view(tight=True)
-        self.fig.canvas.draw_idle()
+        canvas = self.fig.canvas
+        n = self._plot_n
+        # set_xdata/set_ydata直接接受连续的numpy视图，
+        # 省掉set_data对成对输入的归一化和元组构造
+        self.line.set_xdata(self._plot_x[:n])
+        self.line.set_ydata(self._plot_y[:n])
+        xlo, xhi = self.ax.get_xlim()
+        ylo, yhi = self.ax.get_ylim()
+        # 判断是否需要重标定要看整批数据的极值而不是最后一个点：
+        # 一帧中间的尖峰也必须把坐标范围撑开
+        if (self._plot_bg is None or n > xhi
+                or self._ymin < ylo or self._ymax > yhi):
+            # 新点超出当前范围（或背景失效）：用增量维护的极值直接设定
+            # 坐标并完整重绘一次，不再relim重扫全部数据点
+            ypad = (self._ymax - self._ymin) * 0.05 or max(abs(self._ymax), 1e-12) * 0.05
+            self.ax.set_xlim(0, n * 1.05 + 1)
+            self.ax.set_ylim(self._ymin - ypad, self._ymax + ypad)
+            canvas.draw()
+            self._plot_bg = canvas.copy_from_bbox(self.ax.bbox)
+        # 其余帧只恢复背景并重绘线条本身
+        canvas.restore_region(self._plot_bg)
+        self.ax.draw_artist(self.line)
+        canvas.blit(self.ax.bbox)
 
 
     def clear_plot(self):
         """清理图与数据"""
-        self.data = []
+        self._n = 0
+        self._ts_list = []
+        self._plot_n = 0
+        self._plot_bg = None
+        self._ymin, self._ymax = np.inf, -np.inf
         self.line.set_data([], [])
         self.ax.relim()
         self.ax.autoscale_view()
         self.fig.canvas.draw_idle()
 
     def save_data(self):
-        if not self.data:
+        if not self._n:
             return QMessageBox.warning(self, '无数据', '当前没有数据可保存')
         fn, _ = QFileDialog.getSaveFileName(self, '保存 CSV', '', 'CSV (*.csv)')
         if not fn:
             return
         try:
             rows = []
-            for v, cur, ts in self.data:
-                rows.append([ts, f'{v}V' if v is not None else '', cur])
-            with open(fn, 'w', newline='') as f:
+            for k in range(self._n):
+                v = self._arr['v'][k]
+                cur = self._arr['i'][k]
+                # 采样时只记一个整数时间戳，导出时才格式化
+                rows.append([datetime.fromtimestamp(self._ts_list[k] / 1e9).isoformat(),
+                             '' if np.isnan(v) else f'{v}V',
+                             '' if np.isnan(cur) else cur])
+            # 大缓冲一次性写出，避免逐行系统调用
+            with open(fn, 'w', newline='', buffering=1 << 20) as f:
                 csv.writer(f).writerows([['time', 'voltage_V','current_A'], *rows])
             QMessageBox.information(self, '保存', f'数据已保存到 {fn}')
             self.log(f'保存数据 -> {fn}')
@@ -813,10 +994,7 @@ class MainWindow(QMainWindow):
         try:
             with open('gui_geometry.json', 'w') as f:
                 r = self.geometry()
-                tmp = r.split('+')
-                w, h = map(int, tmp[0].split('x'))
-                x, y = map(int, tmp[1:])
-                json.dump({'x': x, 'y': y, 'w': w, 'h': h}, f)
+                json.dump({'x': r.x(), 'y': r.y(), 'w': r.width(), 'h': r.height()}, f)
         except Exception:
             pass
         event.accept()